@@ -1,12 +1,24 @@
 import os
+import json
 import uuid
-from flask import Flask, render_template, request, session, redirect, url_for
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from contextlib import contextmanager
+from flask import (
+    Flask, Response, g, has_app_context, render_template, request, session, redirect, url_for, stream_with_context
+)
 from openai import OpenAI
 from dotenv import load_dotenv
 from datetime import timedelta
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 import pymysql
-from fuzzywuzzy import fuzz
+from guardrails import ApprovedQuestionIndex, Guardrails
+from completion_cache import CompletionCache, NullCache
+from prompt_builder import Compaction, PromptBuilder, TokenCounter
+from session_state import QARecord, SessionStateCache
+from metrics import Registry
 
 
 pymysql.install_as_MySQLdb()  # Make pymysql a drop-in replacement for MySQLdb
@@ -24,22 +36,134 @@ mysql_host = os.getenv("DATABASE_HOST")
 mysql_db = os.getenv("DATABASE_NAME")
 mysql_port = os.getenv("MYSQL_PORT", 3306)  # optional, default 3306
 
-# Construct MySQL URI for SQLAlchemy using PyMySQL driver
-app.config['SQLALCHEMY_DATABASE_URI'] = (
+# Construct MySQL URI for SQLAlchemy using PyMySQL driver; DATABASE_URL overrides it (e.g. sqlite:///bench.db)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL") or (
     f"mysql+pymysql://{mysql_user}:{mysql_password}@{mysql_host}:{mysql_port}/{mysql_db}"
 )
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Connection pool; recycle below MySQL's wait_timeout so idle connections are not dropped under us
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+}
+if not app.config['SQLALCHEMY_DATABASE_URI'].startswith("sqlite"):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update(
+        pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    )
+
+# Upstream limits: per-call timeout, max concurrent completions per process,
+# and how long a turn may wait for a free slot before we report "busy"
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 30))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 8))
+OPENAI_QUEUE_TIMEOUT = float(os.getenv("OPENAI_QUEUE_TIMEOUT", 10))
+
+# Turn pipeline: "sync" (plain form POST), "stream" (SSE) or "async" (background worker + polling)
+TURN_MODE = os.getenv("TURN_MODE", "stream")
+TURN_WORKERS = int(os.getenv("TURN_WORKERS", 8))
+TURN_QUEUE_LIMIT = int(os.getenv("TURN_QUEUE_LIMIT", 64))
+
+# Per-session conversation state kept in memory between requests
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", 1000))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", 3600))
+SESSION_CACHE_MAX_BYTES = int(os.getenv("SESSION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Question candidates: "sequential" (first attempt, then stricter retry) or "parallel" (normal
+# and strict requests raced within CANDIDATE_BUDGET seconds, CANDIDATE_COUNT choices on the normal one;
+# in stream mode the normal prompt is streamed as one choice while the strict one runs alongside)
+CANDIDATE_MODE = os.getenv("CANDIDATE_MODE", "sequential")
+CANDIDATE_COUNT = int(os.getenv("CANDIDATE_COUNT", 2))
+CANDIDATE_BUDGET = float(os.getenv("CANDIDATE_BUDGET", 15))
+
+# Completion cache for the early turns: histories up to COMPLETION_CACHE_MAX_HISTORY messages are
+# served from an in-process LRU (size 0 disables it); COMPLETION_CACHE_PREWARM_FILE is a JSON list
+# of histories to fill it with at startup
+COMPLETION_CACHE_SIZE = int(os.getenv("COMPLETION_CACHE_SIZE", 512))
+COMPLETION_CACHE_TTL = float(os.getenv("COMPLETION_CACHE_TTL", 3600))
+COMPLETION_CACHE_MAX_HISTORY = int(os.getenv("COMPLETION_CACHE_MAX_HISTORY", 4))
+COMPLETION_CACHE_PREWARM_FILE = os.getenv("COMPLETION_CACHE_PREWARM_FILE")
+
+# Prompt size: input token budget per request, messages always kept verbatim, and how much of
+# an older answer survives compaction into facts
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 3000))
+PROMPT_KEEP_RECENT = int(os.getenv("PROMPT_KEEP_RECENT", 6))
+PROMPT_FACT_MAX_CHARS = int(os.getenv("PROMPT_FACT_MAX_CHARS", 300))
+
+# Log one JSON line per request / background turn with its stage timings and token usage
+METRICS_REQUEST_LOG = os.getenv("METRICS_REQUEST_LOG", "false").lower() == "true"
+
+# Also reject questions whose nearest approved question was already covered in the session
+GUARDRAIL_TOPIC_DEDUP = os.getenv("GUARDRAIL_TOPIC_DEDUP", "false").lower() == "true"
+
 db = SQLAlchemy(app)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# OPENAI_BASE_URL lets the app talk to any OpenAI-compatible server (e.g. a local fake for latency tests)
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    base_url=os.getenv("OPENAI_BASE_URL"),
+    timeout=OPENAI_TIMEOUT,
+)
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+upstream_slots = threading.BoundedSemaphore(OPENAI_MAX_CONCURRENCY)
+candidate_executor = ThreadPoolExecutor(max_workers=OPENAI_MAX_CONCURRENCY, thread_name_prefix="candidate")
+completion_cache = (
+    CompletionCache(max_entries=COMPLETION_CACHE_SIZE, ttl=COMPLETION_CACHE_TTL)
+    if COMPLETION_CACHE_SIZE > 0 else NullCache()
+)
+
+# Metrics exposed on /metrics
+registry = Registry()
+stage_seconds = registry.histogram(
+    "chat_stage_seconds",
+    "Time spent in each stage of a turn (db, upstream wait, cache, openai, guardrails, prompt, render).",
+    ["stage"],
+)
+request_seconds = registry.histogram("chat_request_seconds", "Request latency by endpoint.", ["endpoint"])
+openai_tokens = registry.counter("chat_openai_tokens_total", "Tokens reported by the upstream API.", ["kind"])
+# How often each path produced the stored question: "first", "retry", "normal", "strict" or "fallback"
+question_paths = registry.counter("chat_question_path_total", "Which path produced each stored question.", ["path"])
+registry.gauge("chat_completion_cache", "Completion cache hits, misses and entries.", completion_cache.stats, "stat")
+
+def observe_stage(stage, elapsed):
+    """Record ``elapsed`` seconds of a stage into chat_stage_seconds and the per-request log."""
+    stage_seconds.observe(elapsed, stage)
+    if has_app_context():
+        spans = g.setdefault("spans", {})
+        spans[stage] = spans.get(stage, 0.0) + elapsed
+
+@contextmanager
+def span(stage):
+    """Time a stage of the turn into chat_stage_seconds and the per-request log."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+def record_usage(usage):
+    if usage is None:
+        return
+    openai_tokens.inc("prompt", amount=usage.prompt_tokens)
+    openai_tokens.inc("completion", amount=usage.completion_tokens)
+    if has_app_context():
+        tokens = g.setdefault("usage", {"prompt": 0, "completion": 0})
+        tokens["prompt"] += usage.prompt_tokens
+        tokens["completion"] += usage.completion_tokens
 
 # Models for DB
 class ChatSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     session_uuid = db.Column(db.String(64), unique=True, nullable=False)
     qa_items = db.relationship('QAItem', backref='chat_session', lazy=True)
+    # Older turns folded into facts by PromptBuilder, and the last QAItem id they cover
+    compacted_facts = db.Column(db.Text)
+    compacted_through_id = db.Column(db.Integer, default=0)
 
 class QAItem(db.Model):
+    # Serves filter_by(chat_session_id).order_by(id) and the per-role counts from the index alone
+    __table_args__ = (db.Index("ix_qa_item_session_id_role", "chat_session_id", "id", "role"),)
+
     id = db.Column(db.Integer, primary_key=True)
     chat_session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
     role = db.Column(db.String(10), nullable=False)  # "assistant" or "user"
@@ -103,146 +227,860 @@ forbidden_phrases = [
     "future market size"
 ]
 
-def is_forbidden(question):
-    return any(phrase in question.lower() for phrase in forbidden_phrases)
+guardrails = Guardrails(
+    forbidden_phrases,
+    ApprovedQuestionIndex.from_prompt(SYSTEM_PROMPT),
+    topic_dedup=GUARDRAIL_TOPIC_DEDUP,
+)
 
-def is_duplicate(question, qa_items, threshold=80):
-    for item in qa_items:
-        if item.role == "assistant":
-            similarity = fuzz.ratio(item.question.lower(), question.lower())
-            if similarity >= threshold:
-                return True
-    return False
+def prior_questions(qa_items):
+    return [item.question for item in qa_items if item.role == "assistant"]
+
+prompt_builder = PromptBuilder(
+    TokenCounter(OPENAI_MODEL),
+    guardrails.approved_index.questions,
+    guardrails.topic,
+    budget=PROMPT_TOKEN_BUDGET,
+    keep_recent=PROMPT_KEEP_RECENT,
+    max_fact_chars=PROMPT_FACT_MAX_CHARS,
+)
+
+
+RETRY_SYSTEM_PROMPT = SYSTEM_PROMPT + (
+    "\nAvoid forbidden topics like demand forecasting or vague future trends. "
+    "Do not repeat previously asked questions. Ask only useful, new questions."
+)
+
+FIRST_QUESTION = "What is your product and what does it do?"
+FALLBACK_QUESTION = "Thank you. That’s all the questions we needed for now."
+TURN_PENDING_MESSAGE = "The next question is still being prepared."
+TURN_FAILED_MESSAGE = "The assistant could not prepare the next question. Please reload the page to try again."
+
+NEXT_QUESTION_PROMPT = (
+    "Based on the previous Q&A, ask the next most relevant question strictly related to understanding"
+    " the user’s product, its logistics, buyer requirements, and supply-readiness."
+    " You must cover all 4 of these before the 10th question if not already covered:"
+    " Turnaround Time, Supply Capacity, Present Demand, Expected Demand."
+    " Do NOT ask about market trends or insights. Do NOT ask for user’s analysis of the market."
+    " Ask only what the user would realistically know and what helps find customers."
+    " Avoid redundancy."
+)
+
+
+class UpstreamBusy(Exception):
+    """No upstream slot freed up within OPENAI_QUEUE_TIMEOUT."""
+
+class TurnQueueFull(Exception):
+    """The background turn queue is at TURN_QUEUE_LIMIT."""
+
+def acquire_upstream_slot():
+    with span("upstream_wait"):
+        acquired = upstream_slots.acquire(timeout=OPENAI_QUEUE_TIMEOUT)
+    if not acquired:
+        raise UpstreamBusy()
+
+@contextmanager
+def upstream_slot(held=False):
+    """Hold an upstream slot for the block; ``held`` means the caller has already acquired one."""
+    if held:
+        yield
+        return
+    acquire_upstream_slot()
+    try:
+        yield
+    finally:
+        upstream_slots.release()
+
+
+def build_messages(history, system_prompt=SYSTEM_PROMPT):
+    messages = [{"role": "system", "content": system_prompt}]
+    messages.extend(history)
+    return messages
+
+def completion_cache_key(messages, use_cache, **params):
+    """Cache key for a completion request, or None when it has to go upstream.
 
+    Only short histories are cached, so answers for long conversations never change.
+    """
+    if not use_cache or len(messages) - 1 > COMPLETION_CACHE_MAX_HISTORY:
+        return None
+    return completion_cache.key(messages, model=OPENAI_MODEL, max_tokens=150, **params)
 
-def ask_openai(prompt, history, qa_items):
-    def generate_response(messages, temperature=0.7):
+def cache_completion(messages, value, use_cache=True, **params):
+    """Store a completion that passed the guardrails under the same key the generate_* functions read.
+
+    The generate_* functions only read the cache: what they return may still be
+    rejected, and a rejected completion must not be served to the next session.
+    """
+    key = completion_cache_key(messages, use_cache, **params)
+    if key is not None:
+        completion_cache.set(key, value)
+
+def cached_completion(messages, use_cache, **params):
+    """Look a completion up in the cache, timed as its own stage so hits never count as upstream calls."""
+    key = completion_cache_key(messages, use_cache, **params)
+    if key is None:
+        return None
+    with span("completion_cache"):
+        return completion_cache.get(key)
+
+def generate_response(messages, temperature=0.7, use_cache=True, stage="openai"):
+    """Return one completion; only the upstream call itself is timed as ``stage``."""
+    cached = cached_completion(messages, use_cache, temperature=temperature)
+    if cached is not None:
+        return cached
+
+    with upstream_slot(), span(stage):
         response = client.chat.completions.create(
-            model="gpt-4o",
+            model=OPENAI_MODEL,
             messages=messages,
             max_tokens=150,
             temperature=temperature
         )
-        return response.choices[0].message.content.strip()
+    record_usage(response.usage)
+    return response.choices[0].message.content.strip()
 
-    # Build initial messages
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    messages.extend(history)
+def generate_candidates(
+    messages, temperature=0.7, n=1, timeout=None, use_cache=True, slot_held=False, stage="openai"
+):
+    """Return the text of ``n`` completion choices from one request."""
+    cached = cached_completion(messages, use_cache, temperature=temperature, n=n)
+    if cached is not None:
+        return cached
+
+    with upstream_slot(held=slot_held), span(stage):
+        response = client.with_options(timeout=timeout or OPENAI_TIMEOUT).chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=messages,
+            max_tokens=150,
+            temperature=temperature,
+            n=n
+        )
+    record_usage(response.usage)
+    return [choice.message.content.strip() for choice in response.choices if choice.message.content]
+
+def stream_response(messages, temperature=0.7, use_cache=True, slot_held=False, stage="openai_stream"):
+    """Yield completion deltas as the model produces them (a cached completion comes as one delta).
+
+    Only the time spent waiting on upstream is timed as ``stage``, not the
+    time the caller takes to pass each delta on to the client.
+    """
+    cached = cached_completion(messages, use_cache, temperature=temperature)
+    if cached is not None:
+        yield cached
+        return
+
+    with upstream_slot(held=slot_held):
+        upstream = 0.0
+        started = time.perf_counter()
+        try:
+            stream = client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=messages,
+                max_tokens=150,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                record_usage(getattr(chunk, "usage", None))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    upstream += time.perf_counter() - started
+                    started = None
+                    yield chunk.choices[0].delta.content
+                    started = time.perf_counter()
+        finally:
+            if started is not None:
+                upstream += time.perf_counter() - started
+            observe_stage(stage, upstream)
+
+def prewarm_completion_cache(histories):
+    """Fill the completion cache with first-attempt questions for the given histories."""
+    for history in histories:
+        messages = build_messages(history)
+        try:
+            question = generate_response(messages, temperature=0.7)
+        except Exception:
+            app.logger.exception("Could not prewarm the completion cache")
+            return
+        asked = [message["content"] for message in history if message["role"] == "assistant"]
+        covered_topics = {guardrails.topic(question) for question in asked} - {None}
+        if not fails_guardrails(question, asked, covered_topics):
+            cache_completion(messages, question, temperature=0.7)
+
+def fails_guardrails(question, asked, covered_topics=frozenset()):
+    with span("guardrails"):
+        reason = guardrails.check(question, asked, covered_topics)
+    if reason:
+        app.logger.info("Rejected generated question (%s): %r", reason, question)
+    return reason is not None
+
+
+def record_question_path(path):
+    question_paths.inc(path)
+    app.logger.info("Question taken from the %s path (totals: %s)", path, question_paths.snapshot())
+
+
+def ask_openai(prompt, history, qa_items, covered_topics=frozenset(), use_cache=True):
+    asked = prior_questions(qa_items)
+    if CANDIDATE_MODE == "parallel":
+        with span("candidate_race"):
+            return ask_openai_parallel(history, asked, covered_topics, use_cache)
 
-    # First attempt
-    question = generate_response(messages, temperature=0.7)
+    # First attempt, then one retry with a stricter system instruction and lower temperature for less randomness
+    attempts = [("first", SYSTEM_PROMPT, 0.7), ("retry", RETRY_SYSTEM_PROMPT, 0.3)]
+    for path, system_prompt, temperature in attempts:
+        messages = build_messages(history, system_prompt)
+        question = generate_response(messages, temperature=temperature, use_cache=use_cache, stage=f"openai_{path}")
+        if not fails_guardrails(question, asked, covered_topics):
+            cache_completion(messages, question, use_cache, temperature=temperature)
+            record_question_path(path)
+            return question
 
-    if is_forbidden(question) or is_duplicate(question, qa_items):
-        # Retry once with a stricter system instruction appended
-        retry_system_prompt = SYSTEM_PROMPT + (
-            "\nAvoid forbidden topics like demand forecasting or vague future trends. "
-            "Do not repeat previously asked questions. Ask only useful, new questions."
+    record_question_path("fallback")
+    return FALLBACK_QUESTION
+
+def submit_candidates(messages, temperature, n, use_cache=True, wait=True, stage="openai"):
+    """Run generate_candidates() on candidate_executor on an upstream slot taken before it is queued.
+
+    Every queued request already holds its slot, so candidate_executor (one
+    worker per slot) never builds a backlog behind requests that lost a race.
+    Waits up to OPENAI_QUEUE_TIMEOUT for the slot (UpstreamBusy), or with
+    ``wait=False`` returns None at once when none is free.
+    """
+    if wait:
+        acquire_upstream_slot()
+    elif not upstream_slots.acquire(blocking=False):
+        return None
+    try:
+        future = candidate_executor.submit(
+            generate_candidates, messages, temperature, n, CANDIDATE_BUDGET, use_cache, True, stage
+        )
+    except BaseException:
+        upstream_slots.release()
+        raise
+    # Also runs for a request cancelled before it started
+    future.add_done_callback(lambda _: upstream_slots.release())
+    return future
+
+def ask_openai_parallel(history, asked, covered_topics=frozenset(), use_cache=True):
+    """Race the normal and strict prompts instead of retrying one after the other.
+
+    The normal request asks for CANDIDATE_COUNT choices; whichever response
+    arrives first with a candidate that passes the guardrails wins. Requests
+    that have not started by then are cancelled. The sync client cannot abort
+    one already in flight, so losers are bounded by a per-request timeout of
+    CANDIDATE_BUDGET instead. Costs up to CANDIDATE_COUNT + 1 completions per
+    turn in exchange for never paying a second sequential round-trip.
+
+    The strict request only joins the race when an upstream slot is free right
+    away; under load it runs after the normal one, as in sequential mode. If
+    nothing comes back within CANDIDATE_BUDGET the turn raises UpstreamBusy
+    (or the request's error) rather than storing FALLBACK_QUESTION, which is
+    reserved for candidates that were all rejected.
+    """
+    deadline = time.monotonic() + CANDIDATE_BUDGET
+    attempts = {
+        "normal": (build_messages(history), 0.7, CANDIDATE_COUNT),
+        "strict": (build_messages(history, RETRY_SYSTEM_PROMPT), 0.3, 1),
+    }
+
+    def accept(path, candidates):
+        messages, temperature, n = attempts[path]
+        for question in candidates:
+            if not fails_guardrails(question, asked, covered_topics):
+                # Replaying the same choices later picks the same passing one
+                cache_completion(messages, candidates, use_cache, temperature=temperature, n=n)
+                record_question_path(path)
+                return question
+        return None
+
+    requests = {submit_candidates(*attempts["normal"], use_cache, stage="openai_normal"): "normal"}
+    strict = submit_candidates(*attempts["strict"], use_cache, wait=False, stage="openai_strict")
+    if strict is not None:
+        requests[strict] = "strict"
+    received = False
+    errors = []
+    try:
+        for future in as_completed(requests, timeout=max(0.0, deadline - time.monotonic())):
+            path = requests[future]
+            try:
+                candidates = future.result()
+            except Exception as error:
+                app.logger.warning("Candidate request on the %s path failed: %r", path, error)
+                errors.append(error)
+                continue
+            received = True
+            question = accept(path, candidates)
+            if question is not None:
+                return question
+    except FuturesTimeout:
+        app.logger.warning("No acceptable candidate within %.1fs", CANDIDATE_BUDGET)
+    finally:
+        for future in requests:
+            future.cancel()
+
+    if not received:
+        raise errors[0] if errors else UpstreamBusy()
+
+    remaining = deadline - time.monotonic()
+    if strict is None and remaining > 0:
+        messages, temperature, n = attempts["strict"]
+        candidates = generate_candidates(messages, temperature, n, remaining, use_cache, stage="openai_strict")
+        question = accept("strict", candidates)
+        if question is not None:
+            return question
+
+    record_question_path("fallback")
+    return FALLBACK_QUESTION
+
+def stream_openai(prompt, history, qa_items, covered_topics=frozenset(), use_cache=True, slot_held=False):
+    """Streaming counterpart of ask_openai().
+
+    Yields ("token", delta) while a question is being generated. The guardrails
+    run on the finished text; when a streamed question fails them a ("retract", "")
+    event tells the client to discard what it has shown so far before the stricter
+    retry is streamed. The last event is always ("question", final_text), which is
+    the text that gets stored. With ``slot_held`` the caller has already acquired
+    the upstream slot for the whole turn.
+    """
+    asked = prior_questions(qa_items)
+    if CANDIDATE_MODE == "parallel":
+        yield from stream_openai_parallel(history, asked, covered_topics, use_cache, slot_held)
+        return
+
+    attempts = [(SYSTEM_PROMPT, 0.7), (RETRY_SYSTEM_PROMPT, 0.3)]
+    for attempt, (system_prompt, temperature) in enumerate(attempts):
+        if attempt:
+            yield "retract", ""
+        parts = []
+        messages = build_messages(history, system_prompt)
+        deltas = stream_response(
+            messages, temperature=temperature, use_cache=use_cache, slot_held=slot_held,
+            stage="openai_stream_retry" if attempt else "openai_stream_first",
         )
-        retry_messages = [{"role": "system", "content": retry_system_prompt}]
-        retry_messages.extend(history)
+        for delta in deltas:
+            parts.append(delta)
+            yield "token", delta
+        question = "".join(parts).strip()
+        if not fails_guardrails(question, asked, covered_topics):
+            cache_completion(messages, question, use_cache, temperature=temperature)
+            record_question_path("retry" if attempt else "first")
+            yield "question", question
+            return
 
-        # Retry with lower temperature for less randomness
-        question = generate_response(retry_messages, temperature=0.3)
+    record_question_path("fallback")
+    yield "retract", ""
+    yield "question", FALLBACK_QUESTION
 
-        if is_forbidden(question) or is_duplicate(question, qa_items):
-            question = "Thank you. That’s all the questions we needed for now."  # fallback
+def stream_openai_parallel(history, asked, covered_topics=frozenset(), use_cache=True, slot_held=False):
+    """stream_openai() for CANDIDATE_MODE=parallel: stream the normal prompt while the strict one runs.
 
-    return question
+    The strict request goes to candidate_executor as soon as the turn starts,
+    so when the streamed question fails the guardrails its replacement is
+    already on the way instead of costing a second round-trip. Both share
+    CANDIDATE_BUDGET; the strict result arrives as a single "token" event.
+    When no upstream slot is free for it, the strict prompt is streamed after
+    the normal one instead, as in sequential mode. A strict request that does
+    not finish within the budget raises UpstreamBusy.
+    """
+    started = time.monotonic()
+    strict_messages = build_messages(history, RETRY_SYSTEM_PROMPT)
+    strict = submit_candidates(strict_messages, 0.3, 1, use_cache, wait=False, stage="openai_strict")
+    try:
+        parts = []
+        messages = build_messages(history)
+        deltas = stream_response(
+            messages, temperature=0.7, use_cache=use_cache, slot_held=slot_held, stage="openai_stream_first"
+        )
+        for delta in deltas:
+            parts.append(delta)
+            yield "token", delta
+        question = "".join(parts).strip()
+        if not fails_guardrails(question, asked, covered_topics):
+            cache_completion(messages, question, use_cache, temperature=0.7)
+            record_question_path("normal")
+            yield "question", question
+            return
+
+        yield "retract", ""
+        if strict is None:
+            parts = []
+            deltas = stream_response(
+                strict_messages, temperature=0.3, use_cache=use_cache, slot_held=slot_held,
+                stage="openai_stream_retry",
+            )
+            for delta in deltas:
+                parts.append(delta)
+                yield "token", delta
+            question = "".join(parts).strip()
+            if not fails_guardrails(question, asked, covered_topics):
+                cache_completion(strict_messages, question, use_cache, temperature=0.3)
+                record_question_path("strict")
+                yield "question", question
+                return
+            yield "retract", ""
+        else:
+            try:
+                with span("candidate_race"):
+                    candidates = strict.result(timeout=max(0.0, CANDIDATE_BUDGET - (time.monotonic() - started)))
+            except FuturesTimeout:
+                app.logger.warning("No strict candidate within %.1fs", CANDIDATE_BUDGET)
+                raise UpstreamBusy() from None
+            for question in candidates:
+                if not fails_guardrails(question, asked, covered_topics):
+                    cache_completion(strict_messages, candidates, use_cache, temperature=0.3, n=1)
+                    record_question_path("strict")
+                    yield "token", question
+                    yield "question", question
+                    return
+    finally:
+        if strict is not None:
+            strict.cancel()
 
+    record_question_path("fallback")
+    yield "question", FALLBACK_QUESTION
 
 def get_chat_session(session_uuid):
-    return ChatSession.query.filter_by(session_uuid=session_uuid).first()
+    with span("db_session"):
+        return ChatSession.query.filter_by(session_uuid=session_uuid).first()
 
 def create_chat_session():
+    # Flushed only: the row is committed together with the first QAItem of the request
     session_uuid = str(uuid.uuid4())
     new_session = ChatSession(session_uuid=session_uuid)
     db.session.add(new_session)
-    db.session.commit()
+    db.session.flush()
     return new_session
 
+def load_qa_records(chat_session_id, after_id=0):
+    rows = (
+        db.session.query(QAItem.id, QAItem.role, QAItem.question, QAItem.answer)
+        .filter(QAItem.chat_session_id == chat_session_id, QAItem.id > after_id)
+        .order_by(QAItem.id)
+        .all()
+    )
+    return [QARecord(*row) for row in rows]
+
+def summarize_qa_records(chat_session_id):
+    """Row count and highest id of a session's QAItems, answered from the index alone."""
+    return (
+        db.session.query(db.func.count(QAItem.id), db.func.max(QAItem.id))
+        .filter(QAItem.chat_session_id == chat_session_id)
+        .one()
+    )
+
+session_cache = SessionStateCache(
+    load_qa_records,
+    summarize_qa_records,
+    max_entries=SESSION_CACHE_MAX_ENTRIES,
+    ttl=SESSION_CACHE_TTL,
+    max_bytes=SESSION_CACHE_MAX_BYTES,
+    topic_of=guardrails.topic,
+)
+
+def get_session_state(chat_session):
+    with span("db_history"):
+        return session_cache.get(chat_session.session_uuid, chat_session.id)
+
 def get_qa_history(chat_session):
-    return QAItem.query.filter_by(chat_session_id=chat_session.id).order_by(QAItem.id).all()
+    return get_session_state(chat_session).items
+
+def user_qa_item(answer):
+    return QAItem(role="user", question="", answer=answer)
+
+def assistant_qa_item(question):
+    return QAItem(role="assistant", question=question, answer="")
+
+def add_qa_items(state, *qa_items, compaction=None):
+    """Store one turn's QAItems in a single transaction and write them through to the cached session state.
+
+    A ``compaction`` returned by assemble_history() is saved on the ChatSession in
+    the same transaction. It is written by id rather than through the ChatSession
+    instance, because /stream commits from its generator's own session.
+    """
+    for qa_item in qa_items:
+        qa_item.chat_session_id = state.chat_session_id
+    with span("db_write"):
+        db.session.add_all(qa_items)
+        if compaction is not None:
+            db.session.execute(
+                db.update(ChatSession)
+                .where(ChatSession.id == state.chat_session_id)
+                .values(compacted_facts=json.dumps(compaction.to_json()), compacted_through_id=compaction.through_id)
+            )
+        db.session.flush()
+        # Snapshot before commit() expires the instances, which would cost a SELECT per row
+        records = [QARecord(item.id, item.role, item.question, item.answer) for item in qa_items]
+        db.session.commit()
+    for record in records:
+        state.append(record)
+
+def current_chat_session():
+    if "chat_uuid" in session:
+        chat_session = get_chat_session(session["chat_uuid"])
+        if chat_session:
+            return chat_session
+    chat_session = create_chat_session()
+    session["chat_uuid"] = chat_session.session_uuid
+    return chat_session
+
+
+def assemble_history(chat_session, state, pending_answer=None):
+    """Message history for the next question, kept within PROMPT_TOKEN_BUDGET.
+
+    Continues from the compaction stored on the ChatSession. Returns the history
+    and the new compaction, or None when nothing more was folded; pass it to
+    add_qa_items() so it is saved with the turn's QAItems.
+    """
+    compaction = Compaction.from_json(
+        json.loads(chat_session.compacted_facts) if chat_session.compacted_facts else None,
+        chat_session.compacted_through_id,
+    )
+    tail = [{"role": "user", "content": pending_answer}] if pending_answer is not None else []
+    with span("prompt_build"):
+        # Sized for the retry prompt, the longest system prompt this turn may send
+        result = prompt_builder.build(RETRY_SYSTEM_PROMPT, list(state.items), compaction, tail)
+    changed = result.compaction if result.compaction.through_id != compaction.through_id else None
+
+    g.prompt_tokens = result.tokens
+    app.logger.info(
+        "Prompt for session %s: %d tokens, %d verbatim messages, compacted through item %d",
+        chat_session.session_uuid, result.tokens, result.verbatim_messages, result.compaction.through_id,
+    )
+    if result.over_budget:
+        app.logger.warning(
+            "Prompt for session %s is %d tokens, over the %d token budget even after compaction",
+            chat_session.session_uuid, result.tokens, PROMPT_TOKEN_BUDGET,
+        )
+    return result.history, changed
+
+def render(template, **context):
+    with span("render"):
+        return render_template(template, **context)
+
+def log_turn_metrics(event, session_uuid, **fields):
+    """One JSON log line with the stage timings and token usage gathered on ``g``."""
+    if not METRICS_REQUEST_LOG:
+        return
+    record = {
+        "event": event,
+        "session_uuid": session_uuid,
+        **fields,
+        "spans_ms": {stage: round(seconds * 1000, 2) for stage, seconds in g.get("spans", {}).items()},
+        "prompt_tokens": g.get("prompt_tokens"),
+        "usage": g.get("usage"),
+    }
+    app.logger.info(json.dumps(record))
+
+def request_allows_cache():
+    """Clients can send "Cache-Control: no-cache" to bypass the completion cache for a turn."""
+    return "no-cache" not in request.headers.get("Cache-Control", "")
+
+
+def generate_next_question(chat_session_id, use_cache=True):
+    """Background job for the async pipeline: ask the model and store the next question."""
+    chat_session = db.session.get(ChatSession, chat_session_id)
+    state = get_session_state(chat_session)
+    if not state.awaiting_question:
+        return
+
+    history, compaction = assemble_history(chat_session, state)
+    next_question = ask_openai(
+        NEXT_QUESTION_PROMPT, history, list(state.items), frozenset(state.covered_topics), use_cache
+    )
+
+    # Another worker may have answered this turn while we were waiting on the model
+    state = get_session_state(chat_session)
+    if not state.awaiting_question:
+        return
+    add_qa_items(state, assistant_qa_item(next_question), compaction=compaction)
+    log_turn_metrics("background_turn", chat_session.session_uuid)
+
+
+class TurnPipeline:
+    """Bounded background pool for question generation.
+
+    At most one job per session is in flight, and at most ``max_pending`` jobs
+    are queued or running in this process; beyond that ``submit`` raises
+    TurnQueueFull so the caller can push back instead of tying up a web worker.
+    Sessions whose last job raised are remembered until ``take_failure`` reports them.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="turn")
+        self.max_pending = max_pending
+        self.in_flight = {}
+        self.failed = set()
+        self.lock = threading.Lock()
+
+    def is_running(self, session_uuid):
+        with self.lock:
+            return session_uuid in self.in_flight
+
+    def has_capacity(self):
+        with self.lock:
+            return len(self.in_flight) < self.max_pending
+
+    def submit(self, session_uuid, fn, *args):
+        """Queue ``fn(*args)``; returns False if this session already has a job in flight."""
+        with self.lock:
+            if session_uuid in self.in_flight:
+                return False
+            if len(self.in_flight) >= self.max_pending:
+                raise TurnQueueFull()
+            self.failed.discard(session_uuid)
+            self.in_flight[session_uuid] = self.executor.submit(self._run, session_uuid, fn, *args)
+        return True
+
+    def take_failure(self, session_uuid):
+        """True (once) if the last job for this session raised instead of finishing."""
+        with self.lock:
+            if session_uuid in self.failed:
+                self.failed.discard(session_uuid)
+                return True
+            return False
+
+    def _run(self, session_uuid, fn, *args):
+        failed = False
+        try:
+            with app.app_context():
+                fn(*args)
+        except Exception:
+            failed = True
+            app.logger.exception("Turn generation failed for session %s", session_uuid)
+        finally:
+            with self.lock:
+                self.in_flight.pop(session_uuid, None)
+                if failed:
+                    self.failed.add(session_uuid)
+
+
+turn_pipeline = TurnPipeline(TURN_WORKERS, TURN_QUEUE_LIMIT)
+registry.gauge("chat_turn_jobs_in_flight", "Background turn jobs queued or running.", lambda: len(turn_pipeline.in_flight))
+registry.gauge("chat_session_cache_entries", "Sessions held in the state cache.", lambda: len(session_cache.entries))
+
+if COMPLETION_CACHE_PREWARM_FILE:
+    with open(COMPLETION_CACHE_PREWARM_FILE) as prewarm_file:
+        threading.Thread(
+            target=prewarm_completion_cache, args=(json.load(prewarm_file),), name="cache-prewarm", daemon=True
+        ).start()
 
-def build_history(qa_items):
-    history = []
-    for item in qa_items:
-        if item.role == "assistant":
-            history.append({"role": "assistant", "content": item.question})
-        elif item.role == "user":
-            history.append({"role": "user", "content": item.answer})
-    return history
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    # Streamed responses are measured up to the point their body starts
+    elapsed = time.perf_counter() - g.get("request_started", time.perf_counter())
+    request_seconds.observe(elapsed, request.endpoint or "unknown")
+    log_turn_metrics(
+        "request", session.get("chat_uuid"),
+        method=request.method, endpoint=request.endpoint, status=response.status_code,
+        duration_ms=round(elapsed * 1000, 2),
+    )
+    return response
+
+@app.route("/metrics")
+def metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.errorhandler(UpstreamBusy)
+@app.errorhandler(TurnQueueFull)
+def handle_busy(error):
+    message = "The assistant is busy, please try again shortly."
+    # Plain form posts from a browser get a page, fetch() calls from the turn scripts get JSON
+    if request.accept_mimetypes.best_match(["application/json", "text/html"]) == "text/html":
+        return message, 503, {"Retry-After": "2"}
+    return {"error": message}, 503, {"Retry-After": "2"}
 
 
 @app.route("/", methods=["GET", "POST"])
 def index():
-    if "chat_uuid" not in session:
-        chat_session = create_chat_session()
-        session["chat_uuid"] = chat_session.session_uuid
-    else:
-        chat_session = get_chat_session(session["chat_uuid"])
-        if not chat_session:
-            chat_session = create_chat_session()
-            session["chat_uuid"] = chat_session.session_uuid
+    chat_session = current_chat_session()
 
-    qa_items = get_qa_history(chat_session)
-    history = build_history(qa_items)
+    state = get_session_state(chat_session)
 
     if request.method == "POST":
         user_answer = request.form.get("answer")
         if not user_answer or user_answer.strip() == "":
-            last_question = None
-            assistant_items = [item for item in qa_items if item.role == "assistant"]
-            user_items = [item for item in qa_items if item.role == "user"]
-            if len(user_items) < len(assistant_items):
-                last_question = assistant_items[len(user_items)].question
-            else:
-                last_question = "What is your product and what does it do?"
-            return render_template("index.html", question=last_question, qa_log=qa_items)
-
-        user_qa = QAItem(chat_session_id=chat_session.id, role="user", question="", answer=user_answer)
-        db.session.add(user_qa)
-        db.session.commit()
-        qa_items = get_qa_history(chat_session)
+            last_question = state.pending_question or FIRST_QUESTION
+            return render("index.html", question=last_question, qa_log=state.items, turn_mode=TURN_MODE)
 
-        history.append({"role": "user", "content": user_answer})
+        if state.awaiting_question:
+            # The last answer's follow-up question is still being generated (or failed and is re-queued by GET)
+            if state.role_counts["assistant"] >= 10:
+                return redirect(url_for("complete"))
+            return render(
+                "index.html", question="", qa_log=state.items, turn_mode=TURN_MODE, awaiting=True
+            ), 409
 
-        assistant_questions_count = QAItem.query.filter_by(chat_session_id=chat_session.id, role="assistant").count()
-        if assistant_questions_count >= 10:
+        if state.role_counts["assistant"] >= 10:
+            add_qa_items(state, user_qa_item(user_answer))
             return redirect(url_for("complete"))
 
-        next_question = ask_openai(
-            "Based on the previous Q&A, ask the next most relevant question strictly related to understanding"
-            " the user’s product, its logistics, buyer requirements, and supply-readiness."
-            " You must cover all 4 of these before the 10th question if not already covered:"
-            " Turnaround Time, Supply Capacity, Present Demand, Expected Demand."
-            " Do NOT ask about market trends or insights. Do NOT ask for user’s analysis of the market."
-            " Ask only what the user would realistically know and what helps find customers."
-            " Avoid redundancy.",
-            history,
-            qa_items,
-        )
+        history, compaction = assemble_history(chat_session, state, user_answer)
+        try:
+            next_question = ask_openai(
+                NEXT_QUESTION_PROMPT, history, list(state.items), frozenset(state.covered_topics),
+                request_allows_cache(),
+            )
+        except UpstreamBusy:
+            # Backpressure, not a failure: nothing is stored and handle_busy answers 503 with Retry-After
+            raise
+        except Exception:
+            # Keep the answer on its own; the GET below re-queues its follow-up question in the background
+            app.logger.exception("Generating the next question failed for session %s", chat_session.session_uuid)
+            add_qa_items(state, user_qa_item(user_answer))
+            return redirect(url_for("index"))
 
-        assistant_qa = QAItem(chat_session_id=chat_session.id, role="assistant", question=next_question, answer="")
-        db.session.add(assistant_qa)
-        db.session.commit()
-        qa_items = get_qa_history(chat_session)
-        return render_template("index.html", question=next_question, qa_log=qa_items)
+        # The answer and the question it produced are written in one transaction
+        add_qa_items(state, user_qa_item(user_answer), assistant_qa_item(next_question), compaction=compaction)
+        return render("index.html", question=next_question, qa_log=state.items, turn_mode=TURN_MODE)
 
-    if not qa_items:
-        first_question = "What is your product and what does it do?"
-        assistant_qa = QAItem(chat_session_id=chat_session.id, role="assistant", question=first_question, answer="")
-        db.session.add(assistant_qa)
-        db.session.commit()
-        qa_items = get_qa_history(chat_session)
+    if state.awaiting_question and state.role_counts["assistant"] < 10:
+        # The answer is stored but its follow-up question is not: pick the turn up in the background
+        try:
+            turn_pipeline.submit(
+                chat_session.session_uuid, generate_next_question, chat_session.id, request_allows_cache()
+            )
+        except TurnQueueFull:
+            pass
+        return render("index.html", question="", qa_log=state.items, turn_mode=TURN_MODE, awaiting=True)
+
+    if not state.items:
+        first_question = FIRST_QUESTION
+        add_qa_items(state, assistant_qa_item(first_question))
     else:
-        assistant_items = [item for item in qa_items if item.role == "assistant"]
-        user_items = [item for item in qa_items if item.role == "user"]
-        if len(user_items) < len(assistant_items):
-            first_question = assistant_items[len(user_items)].question
-        else:
-            first_question = assistant_items[-1].question if assistant_items else "What is your product and what does it do?"
+        first_question = state.pending_question
+        if first_question is None:
+            first_question = state.assistant_questions[-1] if state.assistant_questions else FIRST_QUESTION
+
+    return render("index.html", question=first_question, qa_log=state.items, turn_mode=TURN_MODE)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/stream", methods=["POST"])
+def stream():
+    """Server-Sent Events variant of the POST to index().
+
+    Emits "token" events with completion deltas, "retract" when a streamed
+    question is rejected by the guardrails, "question" with the stored text
+    once generation is finished, and "complete" when the interview is over.
+    """
+    chat_session = current_chat_session()
+    user_answer = request.form.get("answer")
+    if not user_answer or user_answer.strip() == "":
+        return {"error": "Answer is required."}, 400
 
-    return render_template("index.html", question=first_question, qa_log=qa_items)
+    state = get_session_state(chat_session)
+    if state.awaiting_question:
+        return {"error": TURN_PENDING_MESSAGE}, 409
+    if state.role_counts["assistant"] >= 10:
+        add_qa_items(state, user_qa_item(user_answer))
+        return Response(sse_event("complete", url_for("complete")), mimetype="text/event-stream")
+
+    history, compaction = assemble_history(chat_session, state, user_answer)
+    qa_items = list(state.items)
+    covered_topics = frozenset(state.covered_topics)
+    use_cache = request_allows_cache()
+    session_uuid = chat_session.session_uuid
+
+    def events():
+        started = time.perf_counter()
+        stored = False
+        try:
+            for event, data in stream_openai(
+                NEXT_QUESTION_PROMPT, history, qa_items, covered_topics, use_cache, slot_held=True
+            ):
+                if event == "question":
+                    add_qa_items(
+                        state, user_qa_item(user_answer), assistant_qa_item(data), compaction=compaction
+                    )
+                    stored = True
+                yield sse_event(event, data)
+        except Exception:
+            app.logger.exception("Streaming the next question failed for session %s", session_uuid)
+            if not stored:
+                # Keep the answer on its own; reloading re-queues its follow-up question in the background
+                try:
+                    add_qa_items(state, user_qa_item(user_answer))
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("Could not store the answer for session %s", session_uuid)
+            yield sse_event("error", TURN_FAILED_MESSAGE)
+        # after_request only saw the headers go out; this line covers the whole stream
+        log_turn_metrics(
+            "stream", session_uuid, duration_ms=round((time.perf_counter() - started) * 1000, 2)
+        )
+
+    # The generator writes the turn from its own session, so a ChatSession created by this
+    # request (only flushed so far) has to be committed here or its QAItems would be orphans
+    db.session.commit()
+
+    # Take the upstream slot before the headers go out, so a saturated upstream gets a 503 with
+    # Retry-After instead of a 200 that stalls; it is held for the whole turn, retry included
+    acquire_upstream_slot()
+    response = Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    response.call_on_close(upstream_slots.release)
+    return response
+
+@app.route("/turn", methods=["POST"])
+def submit_turn():
+    """Async pipeline: store the answer, queue question generation and return immediately.
+
+    The client then polls /turn/status until the next question is ready.
+    """
+    chat_session = current_chat_session()
+    user_answer = request.form.get("answer")
+    if not user_answer or user_answer.strip() == "":
+        return {"error": "Answer is required."}, 400
+
+    state = get_session_state(chat_session)
+    if state.awaiting_question:
+        return {"error": TURN_PENDING_MESSAGE}, 409
+    if not turn_pipeline.has_capacity():
+        raise TurnQueueFull()
+
+    # The async pipeline has to commit the answer on its own so the background job can see it
+    add_qa_items(state, user_qa_item(user_answer))
+
+    if state.role_counts["assistant"] >= 10:
+        return {"status": "complete", "url": url_for("complete")}
+
+    turn_pipeline.submit(chat_session.session_uuid, generate_next_question, chat_session.id, request_allows_cache())
+    return {"status": "pending", "status_url": url_for("turn_status")}, 202
+
+@app.route("/turn/status")
+def turn_status():
+    chat_uuid = session.get("chat_uuid")
+    chat_session = get_chat_session(chat_uuid) if chat_uuid else None
+    if not chat_session:
+        return {"error": "No conversation found."}, 404
+
+    state = get_session_state(chat_session)
+    if state.awaiting_question:
+        if state.role_counts["assistant"] >= 10:
+            return {"status": "complete", "url": url_for("complete")}
+        if turn_pipeline.is_running(chat_uuid):
+            return {"status": "pending", "running": True}
+        if turn_pipeline.take_failure(chat_uuid):
+            return {"status": "error", "error": TURN_FAILED_MESSAGE}, 503, {"Retry-After": "2"}
+        # No job for this turn in this process (e.g. it was queued by another worker that went away)
+        try:
+            turn_pipeline.submit(chat_uuid, generate_next_question, chat_session.id, request_allows_cache())
+        except TurnQueueFull:
+            return {"status": "pending", "running": False}
+        return {"status": "pending", "running": True}
+    return {"status": "ready", "question": state.items[-1].question if state.items else FIRST_QUESTION}
 
 @app.route("/complete")
 def complete():
@@ -255,9 +1093,30 @@ def complete():
         return "No conversation found.", 404
 
     qa_items = get_qa_history(chat_session)
-    return render_template("complete.html", qa_log=qa_items)
+    return render("complete.html", qa_log=qa_items)
+
+def upgrade_db():
+    """Create missing tables and indexes; safe to run repeatedly against an existing database."""
+    db.create_all()
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as connection:
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+
+@app.cli.command("upgrade-db")
+def upgrade_db_command():
+    """Bring an existing database up to the current models (flask --app app upgrade-db)."""
+    upgrade_db()
 
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()  # Create tables if not exist
+        upgrade_db()  # Create tables and indexes if not exist
     app.run(debug=True)
@@ -0,0 +1,184 @@
+"""Local OpenAI-compatible /v1/chat/completions stub for latency and load tests.
+
+Answers with approved interview questions the conversation has not seen yet,
+after a configurable delay, optionally streamed token by token. A share of
+responses can be forced to hit the forbidden-phrase or duplicate guardrails
+so the retry and fallback paths get exercised.
+
+    python bench/fake_openai.py --port 8099 --latency 0.8 --forbidden-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=test flask --app app run
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUESTIONS = [
+    "What is the name or model of the product?",
+    "What does this product do, and what problem does it solve?",
+    "What industries or use-cases does this product serve?",
+    "What are the key features or technical specifications?",
+    "What is your current production capacity per month?",
+    "What is the minimum order quantity (MOQ)?",
+    "Are there specific regions or countries you are ready to supply to?",
+    "Can you provide private labeling or custom packaging if required?",
+    "Who are your current or typical customers?",
+    "Are you open to distributors?",
+    "Which geographic regions are you currently supplying to?",
+    "Are there any certifications the product complies with?",
+    "What makes your product better or different from competitors?",
+    "What feedback do you usually get from repeat clients?",
+    "Have you supplied this product for any notable projects or brands?",
+    "What are your after-sales services?",
+    "Are you currently looking to enter new markets or industries?",
+    "Is there any additional information that would help us position your product?",
+]
+FORBIDDEN_QUESTION = "How much future demand do you expect for this product next year?"
+
+
+class FakeOpenAI:
+    """Behaviour shared by all request handlers; counters are read by the load driver."""
+
+    def __init__(self, latency=0.5, jitter=0.1, token_delay=0.02, forbidden_rate=0.0, duplicate_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.forbidden_rate = forbidden_rate
+        self.duplicate_rate = duplicate_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            self.requests += 1
+            return max(0.0, self.random.gauss(self.latency, self.jitter))
+
+    def question(self, messages):
+        asked = [message["content"] for message in messages if message["role"] == "assistant"]
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.forbidden_rate:
+                return FORBIDDEN_QUESTION
+            if asked and roll < self.forbidden_rate + self.duplicate_rate:
+                return asked[-1]
+            fresh = [question for question in QUESTIONS if question not in asked]
+            return self.random.choice(fresh or QUESTIONS)
+
+
+def usage(messages, text):
+    prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+    completion_tokens = max(1, len(text) // 4)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            messages = body.get("messages", [])
+            n = body.get("n") or 1
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            time.sleep(fake.delay())
+            if body.get("stream"):
+                self.stream(completion_id, body, fake.question(messages))
+            else:
+                texts = [fake.question(messages) for _ in range(n)]
+                self.send_json({
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [
+                        {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                        for i, text in enumerate(texts)
+                    ],
+                    "usage": usage(messages, " ".join(texts)),
+                })
+
+        def send_json(self, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def stream(self, completion_id, body, text):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in re.findall(r"\S+\s*", text):
+                self.send_chunk(completion_id, body, {"content": token}, None)
+                time.sleep(fake.token_delay)
+            self.send_chunk(completion_id, body, {}, "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self.send_chunk(completion_id, body, None, None, usage(body.get("messages", []), text))
+            self.write_chunk(b"data: [DONE]\n\n")
+            self.write_chunk(b"")
+
+        def send_chunk(self, completion_id, body, delta, finish_reason, usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                # The trailing usage chunk has no choices, as with the real API
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage:
+                chunk["usage"] = usage
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        def write_chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(fake, host="127.0.0.1", port=0):
+    """Start the stub on a background thread; returns the server (``server.server_address`` has the port)."""
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.5, help="mean seconds before the first byte")
+    parser.add_argument("--jitter", type=float, default=0.1, help="standard deviation of the latency")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument("--forbidden-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(args.latency, args.jitter, args.token_delay, args.forbidden_rate, args.duplicate_rate, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake))
+    print(f"Fake OpenAI listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
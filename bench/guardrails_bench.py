@@ -0,0 +1,75 @@
+"""Per-check latency of the guardrails as the session history grows.
+
+Compares the original per-item loops (substring test per forbidden phrase,
+fuzz.ratio per prior question) with guardrails.Guardrails.
+
+    python bench/guardrails_bench.py --sizes 10 100 1000 10000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rapidfuzz import fuzz  # noqa: E402
+
+from guardrails import ApprovedQuestionIndex, Guardrails  # noqa: E402
+
+FORBIDDEN_PHRASES = [
+    "expected demand", "future demand", "market forecast", "how much future demand", "how much demand",
+    "estimate future sales", "foresee any increase in demand", "market size", "current market size",
+    "future market size",
+]
+
+
+def legacy_is_forbidden(question):
+    return any(phrase in question.lower() for phrase in FORBIDDEN_PHRASES)
+
+
+def legacy_is_duplicate(question, prior_questions, threshold=80):
+    for prior in prior_questions:
+        if fuzz.ratio(prior.lower(), question.lower()) >= threshold:
+            return True
+    return False
+
+
+def make_history(approved, size, rng):
+    templates = list(approved.values())
+    fillers = ["Could you tell me", "Please share", "I'd like to know", "Quick question:"]
+    return [f"{rng.choice(fillers)} {rng.choice(templates).lower()} ({i})" for i in range(size)]
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    import app as chat_app
+
+    approved_index = ApprovedQuestionIndex.from_prompt(chat_app.SYSTEM_PROMPT)
+    guardrails = Guardrails(FORBIDDEN_PHRASES, approved_index)
+    rng = random.Random(0)
+    candidate = "Which certifications does your product currently comply with?"
+
+    print(f"forbidden  legacy {per_call_us(lambda: legacy_is_forbidden(candidate), 20000):8.2f} us"
+          f"   compiled {per_call_us(lambda: guardrails.is_forbidden(candidate), 20000):8.2f} us")
+    print(f"topic      nearest approved question {per_call_us(lambda: guardrails.topic(candidate), 2000):8.2f} us")
+    print(f"{'history':>8}{'legacy dup (us)':>18}{'batched dup (us)':>18}")
+    for size in args.sizes:
+        history = make_history(approved_index.questions, size, rng)
+        number = max(1, 20000 // size)
+        legacy = per_call_us(lambda: legacy_is_duplicate(candidate, history), number)
+        batched = per_call_us(lambda: guardrails.is_duplicate(candidate, history), number)
+        print(f"{size:>8}{legacy:>18.2f}{batched:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
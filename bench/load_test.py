@@ -0,0 +1,298 @@
+"""Simulate concurrent users running full interviews through the Flask routes.
+
+Starts bench/fake_openai.py in-process (unless --base-url points at another
+OpenAI-compatible server), points the app at a throwaway SQLite database
+(unless --database-url is given) and lets --users threads each play
+--sessions complete interviews, including the redirect to /complete.
+
+    python bench/load_test.py --users 20 --mode sync
+    python bench/load_test.py --users 20 --mode stream --latency 1.0 --forbidden-rate 0.1
+
+Reports per-turn latency percentiles (and time to first token in stream
+mode), turns/sec, SQL statements per turn and the share of questions that
+needed a retry or fell back. Statements issued by page loads, /turn/status
+polls and /complete are reported separately as overhead. Every run is
+written to bench/results/ and compared with the previous run that used the
+same settings, including the app's own settings from the environment
+(CANDIDATE_MODE, COMPLETION_CACHE_SIZE, ...).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+sys.path.insert(0, ROOT)
+
+from bench.fake_openai import FakeOpenAI, serve  # noqa: E402
+
+ANSWERS = [
+    "We make stainless steel water bottles, model AquaSteel 500.",
+    "Mostly gyms, outdoor retailers and corporate gifting companies.",
+    "About 40,000 units a month from our plant in Pune.",
+    "Our MOQ is 500 units per colour.",
+    "Yes, we offer private labelling and custom packaging.",
+    "We supply to India, the UAE and parts of Europe.",
+    "The bottles are BPA free and FDA and LFGB certified.",
+    "Double-wall insulation keeps drinks cold for 24 hours.",
+    "Yes, we are open to distributors in new regions.",
+    "We offer a one year warranty and replacement for defects.",
+    "Repeat clients like the finish and on-time delivery.",
+]
+
+# Settings that make two runs comparable: command-line arguments, then app settings read from the environment
+CONFIG_KEYS = ("mode", "users", "sessions", "latency", "jitter", "token_delay", "forbidden_rate", "duplicate_rate")
+SERVER_CONFIG_KEYS = (
+    "CANDIDATE_MODE", "CANDIDATE_COUNT", "COMPLETION_CACHE_SIZE", "COMPLETION_CACHE_MAX_HISTORY", "TURN_WORKERS",
+    "OPENAI_MAX_CONCURRENCY", "PROMPT_TOKEN_BUDGET", "GUARDRAIL_TOPIC_DEDUP",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["sync", "stream", "async"], default="sync")
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--sessions", type=int, default=1, help="interviews per user")
+    parser.add_argument("--base-url", help="use this OpenAI-compatible server instead of the in-process stub")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--forbidden-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="async mode /turn/status poll interval")
+    parser.add_argument("--no-save", action="store_true", help="do not write the result to bench/results/")
+    return parser.parse_args()
+
+
+class Recorder:
+    def __init__(self):
+        self.turns = []
+        self.first_tokens = []
+        self.errors = 0
+        self.statements = 0
+        self.overhead_statements = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def overhead(self):
+        """Count statements issued on this thread as overhead rather than turn work."""
+        self.local.overhead = True
+        try:
+            yield
+        finally:
+            self.local.overhead = False
+
+    def turn(self, seconds, first_token=None):
+        with self.lock:
+            self.turns.append(seconds)
+            if first_token is not None:
+                self.first_tokens.append(first_token)
+
+    def error(self):
+        with self.lock:
+            self.errors += 1
+
+    def statement(self, *args):
+        # Background turn jobs run on their own threads and always count as turn work
+        overhead = getattr(self.local, "overhead", False)
+        with self.lock:
+            if overhead:
+                self.overhead_statements += 1
+            else:
+                self.statements += 1
+
+
+def sync_turn(client, answer, args, recorder):
+    response = client.post("/", data={"answer": answer})
+    if response.status_code == 302:
+        return "complete", None
+    if response.status_code != 200:
+        raise RuntimeError(f"POST / returned {response.status_code}")
+    return "question", None
+
+
+def stream_turn(client, answer, args, recorder):
+    started = time.perf_counter()
+    response = client.post("/stream", data={"answer": answer}, buffered=False)
+    if response.status_code != 200:
+        raise RuntimeError(f"POST /stream returned {response.status_code}")
+    first_token, body = None, ""
+    for chunk in response.response:
+        text = chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+        if first_token is None and ("event: token" in text or "event: question" in text):
+            first_token = time.perf_counter() - started
+        body += text
+    response.close()
+    if "event: complete" in body:
+        return "complete", None
+    return "question", first_token
+
+
+def async_turn(client, answer, args, recorder):
+    response = client.post("/turn", data={"answer": answer})
+    if response.status_code not in (200, 202):
+        raise RuntimeError(f"POST /turn returned {response.status_code}")
+    status = response.get_json()
+    while status["status"] == "pending":
+        time.sleep(args.poll_interval)
+        with recorder.overhead():
+            status = client.get("/turn/status").get_json()
+    if status["status"] == "error":
+        raise RuntimeError(status["error"])
+    return ("complete" if status["status"] == "complete" else "question"), None
+
+
+TURNS = {"sync": sync_turn, "stream": stream_turn, "async": async_turn}
+
+
+def run_user(chat_app, args, recorder, seed):
+    rng = random.Random(seed)
+    play_turn = TURNS[args.mode]
+    for _ in range(args.sessions):
+        client = chat_app.app.test_client()
+        try:
+            with recorder.overhead():
+                client.get("/")
+            while True:
+                started = time.perf_counter()
+                outcome, first_token = play_turn(client, rng.choice(ANSWERS), args, recorder)
+                if outcome == "complete":
+                    with recorder.overhead():
+                        if client.get("/complete").status_code != 200:
+                            raise RuntimeError("GET /complete failed")
+                    break
+                recorder.turn(time.perf_counter() - started, first_token)
+        except Exception as error:
+            print(f"user {seed}: {error}", file=sys.stderr)
+            recorder.error()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def summarize(values):
+    return {f"p{pct}": percentile(values, pct) for pct in (50, 95, 99)}
+
+
+def previous_result(config):
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    for name in sorted(os.listdir(RESULTS_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(RESULTS_DIR, name)) as result_file:
+            result = json.load(result_file)
+        if result.get("config") == config:
+            return name, result
+    return None
+
+
+def print_report(result, previous):
+    def fmt(value, scale=1000, unit="ms"):
+        return "-" if value is None else f"{value * scale:.1f}{unit}"
+
+    baseline = previous[1] if previous else None
+    rows = [("turn p50", "turn_latency", "p50"), ("turn p95", "turn_latency", "p95"),
+            ("turn p99", "turn_latency", "p99"), ("ttft p50", "first_token", "p50"),
+            ("ttft p95", "first_token", "p95"), ("ttft p99", "first_token", "p99")]
+    print(f"{'metric':<18}{'this run':>12}{'previous':>12}")
+    for label, group, key in rows:
+        current = result[group][key]
+        if current is None:
+            continue
+        before = baseline[group][key] if baseline else None
+        print(f"{label:<18}{fmt(current):>12}{fmt(before):>12}")
+    for label, key, unit in [("turns/sec", "turns_per_sec", ""), ("sql stmts/turn", "statements_per_turn", ""),
+                             ("overhead stmts", "overhead_statements_per_turn", ""), ("retry rate", "retry_rate", "%")]:
+        scale = 100 if unit == "%" else 1
+        before = baseline.get(key) if baseline else None
+        print(f"{label:<18}{fmt(result[key], scale, unit):>12}{fmt(before, scale, unit):>12}")
+    print(f"turns {result['turns']}, errors {result['errors']}, question paths {result['question_paths']}")
+    print(f"app settings {result['config']['server']}")
+    if previous:
+        print(f"compared with {previous[0]}")
+
+
+def main():
+    args = parse_args()
+
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+    else:
+        fake = FakeOpenAI(args.latency, args.jitter, args.token_delay, args.forbidden_rate, args.duplicate_rate,
+                          seed=args.seed)
+        server = serve(fake)
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ["DATABASE_URL"] = args.database_url or (
+        "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load.db")
+    )
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+
+    import app as chat_app
+    from sqlalchemy import event
+
+    config = {key: getattr(args, key) for key in CONFIG_KEYS}
+    config["server"] = {key: getattr(chat_app, key) for key in SERVER_CONFIG_KEYS}
+
+    recorder = Recorder()
+    with chat_app.app.app_context():
+        chat_app.upgrade_db()
+        event.listen(chat_app.db.engine, "before_cursor_execute", recorder.statement)
+
+    users = [
+        threading.Thread(target=run_user, args=(chat_app, args, recorder, args.seed + i), name=f"user-{i}")
+        for i in range(args.users)
+    ]
+    started = time.perf_counter()
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.perf_counter() - started
+
+    paths = chat_app.question_paths.snapshot()
+    generated = sum(paths.values())
+    turns = len(recorder.turns)
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": config,
+        "turns": turns,
+        "errors": recorder.errors,
+        "elapsed": elapsed,
+        "turns_per_sec": turns / elapsed if elapsed else None,
+        "turn_latency": summarize(recorder.turns),
+        "first_token": summarize(recorder.first_tokens),
+        "statements_per_turn": recorder.statements / turns if turns else None,
+        "overhead_statements_per_turn": recorder.overhead_statements / turns if turns else None,
+        "question_paths": paths,
+        "retry_rate": 1 - (paths.get("first", 0) + paths.get("normal", 0)) / generated if generated else None,
+    }
+
+    previous = previous_result(config)
+    print_report(result, previous)
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{args.mode}.json"
+        with open(os.path.join(RESULTS_DIR, name), "w") as result_file:
+            json.dump(result, result_file, indent=2)
+        print(f"saved bench/results/{name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Check which approved question realistic rephrasings map to.
+
+ApprovedQuestionIndex.nearest() drives topic dedup and the facts that
+PromptBuilder compacts older turns into, so a wrong mapping both rejects
+good questions and files answers under the wrong heading. Each case below
+is a question the model might plausibly ask, with the approved question it
+should map to (None: it matches none of them). A case that maps nowhere
+although it has an expected topic is only reported as a miss; mapping to
+the wrong question fails the run.
+
+    python bench/topic_check.py
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from guardrails import ApprovedQuestionIndex  # noqa: E402
+
+CASES = [
+    ("What's the name of your product?", 1),
+    ("Which model is it?", 1),
+    ("What is your product and what does it do?", 2),
+    ("What problem does your product solve?", 2),
+    ("Which industries use your product?", 3),
+    ("What are the main use cases for it?", 3),
+    ("What are the technical specifications?", 4),
+    ("Can you describe the key features?", 4),
+    ("How many units can you produce per month?", 5),
+    ("What is your monthly production capacity?", 5),
+    ("What's your MOQ?", 6),
+    ("What is the minimum quantity per order?", 6),
+    ("Which countries are you ready to supply to?", 7),
+    ("Do you offer private label or custom packaging?", 8),
+    ("Who are your typical customers?", 9),
+    ("Would you be open to working with distributors?", 10),
+    ("Which regions are you currently supplying?", 11),
+    ("Does the product have any certifications?", 12),
+    ("What certifications does the product comply with?", 12),
+    ("What makes your product different from competitors?", 13),
+    ("What feedback do repeat clients give you?", 14),
+    ("Have you supplied any notable brands or projects?", 15),
+    ("What after-sales services do you provide?", 16),
+    ("Are you looking to enter new markets?", 17),
+    ("Is there anything else that would help us position your product?", 18),
+    ("What is the price of the product?", None),
+    ("Could you tell me more about your product?", None),
+    ("What is your delivery lead time?", None),
+]
+
+
+def main():
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    import app as chat_app
+
+    index = ApprovedQuestionIndex.from_prompt(chat_app.SYSTEM_PROMPT)
+    cases = CASES + [(chat_app.FIRST_QUESTION, 2)] + [(question, number) for number, question in index.questions.items()]
+    wrong = missed = 0
+    for question, expected in cases:
+        got = index.nearest(question)
+        if got == expected:
+            continue
+        if got is None:
+            missed += 1
+            label = "miss "
+        else:
+            wrong += 1
+            label = "WRONG"
+        print(f"{label} {question!r}: expected {expected}, got {got}")
+    print(f"{len(cases)} cases, {wrong} wrong, {missed} missed")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
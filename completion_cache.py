@@ -0,0 +1,75 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_messages(messages):
+    """Collapse whitespace and case so trivially different histories share a key."""
+    return [(message["role"], " ".join(message["content"].split()).casefold()) for message in messages]
+
+
+class CompletionCache:
+    """Size-bounded LRU of completion results with a TTL and hit/miss counters.
+
+    Keys are built by ``key`` from the normalised messages plus whatever
+    request parameters change the output (model, temperature, n, ...).
+    Anything with the same ``key``/``get``/``set``/``stats`` methods can be
+    used in its place, e.g. a shared cache backed by Redis.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(messages, **params):
+        payload = json.dumps([normalize_messages(messages), sorted(params.items())], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+class NullCache:
+    """Drop-in for CompletionCache that never stores anything."""
+
+    @staticmethod
+    def key(messages, **params):
+        return None
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def stats(self):
+        return {"hits": 0, "misses": 0, "entries": 0}
@@ -0,0 +1,147 @@
+import math
+import re
+from collections import Counter
+
+from rapidfuzz import fuzz, process
+
+APPROVED_LIST_HEADER = "Approved Questions List:"
+APPROVED_ITEM_RE = re.compile(r"^\s*(\d+)\.\s+(.+?)\s*$")
+NON_WORD_RE = re.compile(r"[^a-z0-9\s]+")
+
+# Words that carry no topic: dropping them lets a rephrased question land on the approved one it came from.
+# "do"/"does" are kept, since "what does it do" is what tells question 2 apart from question 1
+STOPWORDS = frozenset("""
+    a an and any are can could for have how in is it me of on or please tell that the there
+    this to what which who would you your
+""".split())
+PLURAL_SUFFIXES = ("ing", "es", "s")
+
+
+def stem(word):
+    for suffix in PLURAL_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def topic_terms(text):
+    """Set of crudely stemmed content words ("supplying" and "supply" become one term)."""
+    return {stem(word) for word in NON_WORD_RE.sub(" ", text.lower()).split() if word not in STOPWORDS}
+
+
+def parse_approved_questions(system_prompt):
+    """Return {number: question} for the numbered list under "Approved Questions List:"."""
+    _, _, section = system_prompt.partition(APPROVED_LIST_HEADER)
+    questions = {}
+    for line in section.strip().splitlines():
+        match = APPROVED_ITEM_RE.match(line)
+        if not match:
+            break
+        questions[int(match.group(1))] = match.group(2)
+    return questions
+
+
+class PhraseMatcher:
+    """All forbidden phrases compiled into one case-insensitive regex, scanned in a single pass."""
+
+    def __init__(self, phrases):
+        phrases = sorted({phrase.lower() for phrase in phrases if phrase}, key=len, reverse=True)
+        self.pattern = re.compile("|".join(map(re.escape, phrases))) if phrases else None
+
+    def search(self, text):
+        """Return the first forbidden phrase found in ``text``, or None."""
+        if self.pattern is None:
+            return None
+        match = self.pattern.search(text.lower())
+        return match.group(0) if match else None
+
+
+class ApprovedQuestionIndex:
+    """Maps a generated question to the nearest approved question from SYSTEM_PROMPT.
+
+    Questions are compared as sets of topic terms weighted by how rare each
+    term is among the approved questions, so "product", which most of them
+    share, counts for little. The score is a weighted Dice coefficient (0-100):
+    terms that only one side has pull it down, so "What is the price of the
+    product?" does not land on "What is the name or model of the product?".
+    Below ``min_score``, or on a tie, there is no nearest question.
+    """
+
+    def __init__(self, questions, min_score=30):
+        self.questions = questions
+        self.min_score = min_score
+        self.terms = {number: topic_terms(question) for number, question in questions.items()}
+        counts = Counter(term for terms in self.terms.values() for term in terms)
+        total = len(self.terms)
+        self.weights = {term: math.log((total + 1) / (count + 1)) + 1 for term, count in counts.items()}
+        # Terms no approved question uses weigh the most
+        self.unseen_weight = math.log(total + 1) + 1
+        self.term_weights = {number: self.weight(terms) for number, terms in self.terms.items()}
+
+    @classmethod
+    def from_prompt(cls, system_prompt, **kwargs):
+        return cls(parse_approved_questions(system_prompt), **kwargs)
+
+    def weight(self, terms):
+        return sum(self.weights.get(term, self.unseen_weight) for term in terms)
+
+    def score(self, terms, number, terms_weight=None):
+        approved = self.terms[number]
+        if not terms or not approved:
+            return 0.0
+        if terms_weight is None:
+            terms_weight = self.weight(terms)
+        return 200 * self.weight(terms & approved) / (terms_weight + self.term_weights[number])
+
+    def nearest(self, question):
+        """Return the approved question number closest to ``question``, or None if nothing is close."""
+        terms = topic_terms(question)
+        terms_weight = self.weight(terms)
+        scores = sorted(((self.score(terms, number, terms_weight), number) for number in self.terms), reverse=True)
+        if not scores or scores[0][0] < self.min_score:
+            return None
+        if len(scores) > 1 and scores[1][0] == scores[0][0]:
+            return None
+        return scores[0][1]
+
+
+class Guardrails:
+    """Checks a candidate question before it is shown.
+
+    ``check`` returns the reason a question is rejected ("forbidden",
+    "duplicate" or, with ``topic_dedup``, "topic") or None if it may be used.
+    Duplicate detection scores the candidate against every prior question in
+    one batched call instead of a Python loop.
+    """
+
+    def __init__(self, forbidden_phrases, approved_index, duplicate_threshold=80, topic_dedup=False):
+        self.matcher = PhraseMatcher(forbidden_phrases)
+        self.approved_index = approved_index
+        self.duplicate_threshold = duplicate_threshold
+        self.topic_dedup = topic_dedup
+
+    def is_forbidden(self, question):
+        return self.matcher.search(question) is not None
+
+    def is_duplicate(self, question, prior_questions, threshold=None):
+        threshold = self.duplicate_threshold if threshold is None else threshold
+        if not prior_questions:
+            return False
+        # fuzz.ratio is a float here; round it like the integer scores the threshold was tuned on
+        best = process.extractOne(
+            question.lower(), [prior.lower() for prior in prior_questions],
+            scorer=fuzz.ratio, processor=None, score_cutoff=threshold - 0.5,
+        )
+        return best is not None and round(best[1]) >= threshold
+
+    def topic(self, question):
+        return self.approved_index.nearest(question)
+
+    def check(self, question, prior_questions, covered_topics=frozenset()):
+        if self.is_forbidden(question):
+            return "forbidden"
+        if self.is_duplicate(question, prior_questions):
+            return "duplicate"
+        if self.topic_dedup and covered_topics and self.topic(question) in covered_topics:
+            return "topic"
+        return None
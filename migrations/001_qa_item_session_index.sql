@@ -0,0 +1,6 @@
+-- Composite index for the per-session history query (chat_session_id = ? ORDER BY id)
+-- and the per-role counts. Matches QAItem.__table_args__; `flask --app app upgrade-db`
+-- applies the same change, so run only one of the two.
+ALTER TABLE qa_item
+    ADD INDEX ix_qa_item_session_id_role (chat_session_id, id, role),
+    ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,6 @@
+-- Prompt compaction state on chat_session (ChatSession.compacted_facts / compacted_through_id).
+-- `flask --app app upgrade-db` applies the same change, so run only one of the two.
+ALTER TABLE chat_session
+    ADD COLUMN compacted_facts TEXT NULL,
+    ADD COLUMN compacted_through_id INTEGER NULL DEFAULT 0,
+    ALGORITHM=INPLACE, LOCK=NONE;
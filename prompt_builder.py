@@ -0,0 +1,148 @@
+import logging
+import math
+from functools import lru_cache
+from typing import NamedTuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Chat formatting overhead per message and for priming the reply, as documented for the gpt-4 family
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+class TokenCounter:
+    """Counts prompt tokens locally with tiktoken, or estimates ~4 characters per token without it."""
+
+    def __init__(self, model):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except Exception:
+                logger.warning("No tiktoken encoding available for %s; estimating token counts", model)
+        self.count_text = lru_cache(maxsize=4096)(self._count_text)
+
+    def _count_text(self, text):
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return math.ceil(len(text) / 4)
+
+    def count_messages(self, messages):
+        return TOKENS_PER_REPLY + sum(TOKENS_PER_MESSAGE + self.count_text(message["content"]) for message in messages)
+
+
+class Compaction(NamedTuple):
+    """Older turns folded into facts: ``facts`` maps an approved question number (as a string,
+    so it survives JSON) to the client's answer, ``other`` holds [question, answer] pairs that
+    matched no approved question, and ``through_id`` is the last QAItem id folded in."""
+    facts: dict
+    other: list
+    through_id: int
+
+    @classmethod
+    def from_json(cls, data, through_id):
+        data = data or {}
+        return cls(dict(data.get("facts", {})), list(data.get("other", [])), through_id or 0)
+
+    def to_json(self):
+        return {"facts": self.facts, "other": self.other}
+
+
+class PromptResult(NamedTuple):
+    history: list
+    compaction: Compaction
+    tokens: int
+    verbatim_messages: int
+    # True when even the fully compacted prompt is still over the budget
+    over_budget: bool
+
+
+class PromptBuilder:
+    """Assembles the message history sent with each turn within a token budget.
+
+    Turns newer than ``compaction.through_id`` are sent verbatim. While the
+    prompt is over ``budget`` the oldest verbatim question/answer pair is
+    folded into the compaction, always keeping the last ``keep_recent``
+    messages verbatim. The compaction is rendered as one system message
+    listing the facts gathered per approved question, and is returned so the
+    caller can store it and continue from it next turn instead of starting
+    over. Every fact, including answers merged under the same question, is
+    capped at ``max_fact_chars``; if the prompt still does not fit,
+    ``over_budget`` is set on the result.
+    """
+
+    def __init__(self, counter, approved_questions, topic_of, budget=3000, keep_recent=6, max_fact_chars=300):
+        self.counter = counter
+        self.approved_questions = approved_questions
+        self.topic_of = topic_of
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.max_fact_chars = max_fact_chars
+
+    def build(self, system_prompt, records, compaction, tail=()):
+        """Return a PromptResult for ``records`` (QARecords in id order) plus ``tail`` messages."""
+        verbatim = [record for record in records if record.id > compaction.through_id]
+        tail = list(tail)
+        while True:
+            history = self.render(compaction, verbatim, tail)
+            tokens = self.counter.count_messages([{"role": "system", "content": system_prompt}] + history)
+            if tokens <= self.budget or len(verbatim) + len(tail) <= self.keep_recent or not verbatim:
+                return PromptResult(history, compaction, tokens, len(verbatim) + len(tail), tokens > self.budget)
+            folded = self.oldest_pair(verbatim)
+            compaction = self.fold(compaction, folded)
+            verbatim = verbatim[len(folded):]
+
+    def render(self, compaction, verbatim, tail):
+        history = []
+        if compaction.facts or compaction.other:
+            history.append({"role": "system", "content": self.render_facts(compaction)})
+        for record in verbatim:
+            if record.role == "assistant":
+                history.append({"role": "assistant", "content": record.question})
+            elif record.role == "user":
+                history.append({"role": "user", "content": record.answer})
+        history.extend(tail)
+        return history
+
+    def render_facts(self, compaction):
+        lines = ["Facts the client already gave in earlier turns (do not ask for these again):"]
+        for number, answer in sorted(compaction.facts.items(), key=lambda fact: int(fact[0])):
+            lines.append(f"- {self.approved_questions.get(int(number), number)} -> {answer}")
+        for question, answer in compaction.other:
+            lines.append(f"- {question} -> {answer}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def oldest_pair(verbatim):
+        """The oldest assistant question together with the answer that follows it."""
+        if verbatim[0].role == "assistant" and len(verbatim) > 1 and verbatim[1].role == "user":
+            return verbatim[:2]
+        return verbatim[:1]
+
+    def fold(self, compaction, records):
+        question = next((record.question for record in records if record.role == "assistant"), "")
+        answer = next((record.answer for record in records if record.role == "user"), "")
+        facts, other = dict(compaction.facts), list(compaction.other)
+        if answer:
+            answer = self.shorten(answer)
+            topic = self.topic_of(question) if question else None
+            if topic is not None:
+                key = str(topic)
+                # Keep the newest part when answers under the same question pile up
+                facts[key] = self.shorten(f"{facts[key]}; {answer}", keep_end=True) if key in facts else answer
+            else:
+                other.append([question or "Earlier answer", answer])
+        return Compaction(facts, other, records[-1].id)
+
+    def shorten(self, text, keep_end=False):
+        text = " ".join(text.split())
+        if len(text) <= self.max_fact_chars:
+            return text
+        if keep_end:
+            return "…" + text[len(text) - self.max_fact_chars + 1:].lstrip()
+        return text[:self.max_fact_chars - 1].rstrip() + "…"
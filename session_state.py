@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import NamedTuple
+
+
+class QARecord(NamedTuple):
+    """Detached, read-only copy of a QAItem row (same attribute names the templates use)."""
+    id: int
+    role: str
+    question: str
+    answer: str
+
+
+class SessionState:
+    """Incrementally maintained view of one conversation.
+
+    Holds the ordered QA records, per-role counts, the question the user still
+    has to answer and, when a ``topic_of`` classifier is given, the set of
+    approved-question topics the assistant has already covered. Records are
+    applied in id order and anything at or below ``last_id`` is ignored, so
+    replaying rows that were already seen is harmless; a record committed out
+    of id order goes through ``rebuild`` instead.
+    """
+
+    def __init__(self, session_uuid, chat_session_id, topic_of=None):
+        self.session_uuid = session_uuid
+        self.chat_session_id = chat_session_id
+        self.topic_of = topic_of
+        self.items = []
+        self.assistant_questions = []
+        self.covered_topics = set()
+        self.role_counts = Counter()
+        self.last_id = 0
+        self.size = 0
+        # Part of ``size`` already counted in SessionStateCache's byte total
+        self.accounted_size = 0
+        self.touched = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reset(self):
+        self.items = []
+        self.assistant_questions = []
+        self.covered_topics = set()
+        self.role_counts = Counter()
+        self.last_id = 0
+        self.size = 0
+
+    def rebuild(self, records):
+        """Start over from ``records`` (the full session, in any order)."""
+        self.reset()
+        for record in sorted(records, key=lambda record: record.id):
+            self.apply(record)
+
+    def apply(self, record):
+        if record.id <= self.last_id:
+            return
+        self.items.append(record)
+        if record.role == "assistant":
+            self.assistant_questions.append(record.question)
+            topic = self.topic_of(record.question) if self.topic_of else None
+            if topic is not None:
+                self.covered_topics.add(topic)
+        self.role_counts[record.role] += 1
+        self.last_id = record.id
+        self.size += len(record.question or "") + len(record.answer or "")
+
+    def append(self, record):
+        """Write-through hook: apply a record that has just been committed."""
+        with self.lock:
+            if record.id > self.last_id:
+                self.apply(record)
+            elif all(item.id != record.id for item in self.items):
+                # Another request committed a later row first
+                self.rebuild(self.items + [record])
+
+    @property
+    def pending_question(self):
+        """The question the user still has to answer, if any."""
+        answered = self.role_counts["user"]
+        if answered < len(self.assistant_questions):
+            return self.assistant_questions[answered]
+        return None
+
+    @property
+    def awaiting_question(self):
+        """True when the last record is an answer that has no follow-up question yet."""
+        return bool(self.items) and self.items[-1].role == "user"
+
+
+class SessionStateCache:
+    """LRU/TTL cache of SessionState keyed by ``session_uuid``.
+
+    ``loader(chat_session_id, after_id)`` must return the QARecords of a session
+    with ``id > after_id`` in id order, and ``summarize(chat_session_id)`` its
+    row count and highest id. Every ``get`` compares the summary with the
+    cached state, which is how a state cached in one gunicorn worker catches up
+    with turns written by another: the common case is a single index-only
+    query. When there are new rows only those newer than ``last_id`` are
+    loaded; if the counts still disagree (a row was committed out of id order,
+    e.g. a double submit racing the background job) the session is reloaded.
+
+    Entries are evicted least-recently-used first once there are more than
+    ``max_entries`` of them, their text exceeds ``max_bytes`` or they have been
+    idle for longer than ``ttl`` seconds. The byte total is kept as a running
+    sum, updated whenever an entry is fetched.
+    """
+
+    def __init__(self, loader, summarize, max_entries=1000, ttl=3600, max_bytes=64 * 1024 * 1024, topic_of=None):
+        self.loader = loader
+        self.summarize = summarize
+        self.topic_of = topic_of
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, session_uuid, chat_session_id):
+        now = time.monotonic()
+        with self.lock:
+            state = self.entries.get(session_uuid)
+            if state is not None and (now - state.touched > self.ttl or state.chat_session_id != chat_session_id):
+                self._remove(session_uuid)
+                state = None
+            if state is None:
+                state = SessionState(session_uuid, chat_session_id, topic_of=self.topic_of)
+                self.entries[session_uuid] = state
+            self.entries.move_to_end(session_uuid)
+            state.touched = now
+
+        with state.lock:
+            self._sync(state)
+            delta = state.size - state.accounted_size
+            state.accounted_size = state.size
+
+        with self.lock:
+            if self.entries.get(session_uuid) is state:
+                self.total_bytes += delta
+            self._evict(now)
+        return state
+
+    def _sync(self, state):
+        if not state.items:
+            # Nothing cached yet, so one full load is as cheap as the summary
+            for record in self.loader(state.chat_session_id, 0):
+                state.apply(record)
+            return
+        count, max_id = self.summarize(state.chat_session_id)
+        max_id = max_id or 0
+        if count == len(state.items) and max_id == state.last_id:
+            return
+        if max_id > state.last_id:
+            for record in self.loader(state.chat_session_id, state.last_id):
+                state.apply(record)
+        if count != len(state.items) or max_id != state.last_id:
+            state.rebuild(self.loader(state.chat_session_id, 0))
+
+    def _remove(self, session_uuid):
+        state = self.entries.pop(session_uuid)
+        self.total_bytes -= state.accounted_size
+
+    def _evict(self, now):
+        # Least recently used first, so idle entries are always at the front
+        while self.entries:
+            session_uuid, state = next(iter(self.entries.items()))
+            over_limit = len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes
+            if not over_limit and now - state.touched <= self.ttl:
+                break
+            self._remove(session_uuid)
@@ -0,0 +1,140 @@
+"""Two SessionStateCache instances (two gunicorn workers) sharing one SQLite database."""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_state import QARecord, SessionStateCache  # noqa: E402
+
+SESSION = "session-1"
+CHAT_SESSION_ID = 1
+
+
+class Database:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE qa_item (id INTEGER PRIMARY KEY, chat_session_id INTEGER, role TEXT, question TEXT,"
+            " answer TEXT)"
+        )
+
+    def insert(self, record, chat_session_id=CHAT_SESSION_ID):
+        self.connection.execute(
+            "INSERT INTO qa_item VALUES (?, ?, ?, ?, ?)",
+            (record.id, chat_session_id, record.role, record.question, record.answer),
+        )
+        self.connection.commit()
+        return record
+
+    def load(self, chat_session_id, after_id=0):
+        rows = self.connection.execute(
+            "SELECT id, role, question, answer FROM qa_item WHERE chat_session_id = ? AND id > ? ORDER BY id",
+            (chat_session_id, after_id),
+        )
+        return [QARecord(*row) for row in rows]
+
+    def summarize(self, chat_session_id):
+        return self.connection.execute(
+            "SELECT count(id), max(id) FROM qa_item WHERE chat_session_id = ?", (chat_session_id,)
+        ).fetchone()
+
+    def cache(self, **kwargs):
+        return SessionStateCache(self.load, self.summarize, **kwargs)
+
+
+def question(record_id, text="Q"):
+    return QARecord(record_id, "assistant", f"{text}{record_id}", "")
+
+
+def answer(record_id, text="A"):
+    return QARecord(record_id, "user", "", f"{text}{record_id}")
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "qa.db"))
+
+
+def ids(state):
+    return [record.id for record in state.items]
+
+
+def test_worker_catches_up_with_interleaved_writes(db):
+    worker_a, worker_b = db.cache(), db.cache()
+    state_a = worker_a.get(SESSION, CHAT_SESSION_ID)
+    state_a.append(db.insert(question(1)))
+    assert ids(worker_b.get(SESSION, CHAT_SESSION_ID)) == [1]
+
+    # B answers, A asks the next question, each writing through to its own cache
+    state_b = worker_b.get(SESSION, CHAT_SESSION_ID)
+    state_b.append(db.insert(answer(2)))
+    state_a = worker_a.get(SESSION, CHAT_SESSION_ID)
+    state_a.append(db.insert(question(3)))
+
+    for worker in (worker_a, worker_b):
+        state = worker.get(SESSION, CHAT_SESSION_ID)
+        assert ids(state) == [1, 2, 3]
+        assert state.role_counts == {"assistant": 2, "user": 1}
+        assert state.pending_question == "Q3"
+
+
+def test_row_committed_out_of_id_order_is_picked_up(db):
+    worker_a, worker_b = db.cache(), db.cache()
+    worker_a.get(SESSION, CHAT_SESSION_ID).append(db.insert(question(1)))
+    worker_b.get(SESSION, CHAT_SESSION_ID)
+
+    # id 3 commits before id 2 (a double submit racing the background job); B sees 3 first
+    db.insert(question(3))
+    assert ids(worker_b.get(SESSION, CHAT_SESSION_ID)) == [1, 3]
+    db.insert(answer(2))
+    state_b = worker_b.get(SESSION, CHAT_SESSION_ID)
+    assert ids(state_b) == [1, 2, 3]
+    assert state_b.assistant_questions == ["Q1", "Q3"]
+    assert state_b.role_counts == {"assistant": 2, "user": 1}
+
+
+def test_write_through_out_of_order_rebuilds(db):
+    worker = db.cache()
+    state = worker.get(SESSION, CHAT_SESSION_ID)
+    state.append(db.insert(question(1)))
+    state.append(db.insert(question(3)))
+    state.append(db.insert(answer(2)))
+    assert ids(state) == [1, 2, 3]
+    assert not state.awaiting_question
+    # Replaying a row that is already there changes nothing
+    state.append(answer(2))
+    assert ids(state) == [1, 2, 3]
+    assert ids(worker.get(SESSION, CHAT_SESSION_ID)) == [1, 2, 3]
+
+
+def test_idle_entries_expire_without_being_read(db, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("session_state.time.monotonic", lambda: now[0])
+    worker = db.cache(ttl=60)
+    db.insert(question(1), chat_session_id=1)
+    db.insert(question(2), chat_session_id=2)
+    worker.get("idle", 1)
+    now[0] += 61
+    worker.get("busy", 2)
+    assert list(worker.entries) == ["busy"]
+    assert worker.total_bytes == len("Q2")
+
+
+def test_byte_cap_evicts_least_recently_used(db):
+    worker = db.cache(max_bytes=10)
+    for chat_session_id in (1, 2, 3):
+        db.insert(question(chat_session_id, text="Q---"), chat_session_id=chat_session_id)
+        worker.get(f"session-{chat_session_id}", chat_session_id)
+    # Three entries of five bytes each: the oldest one goes
+    assert list(worker.entries) == ["session-2", "session-3"]
+    assert worker.total_bytes == 10
+
+    # Growing an entry through write-through is counted on its next get
+    state = worker.get("session-2", 2)
+    state.append(db.insert(answer(4, text="A---"), chat_session_id=2))
+    worker.get("session-2", 2)
+    assert list(worker.entries) == ["session-2"]
+    assert worker.total_bytes == 10